@@ -1,14 +1,19 @@
 from typing import List, Sequence
 import os
 import re
+import bisect
 import math
 import logging
+import threading
 
 import euklid
 import xfoil
+import numpy
 import pandas
 
-from pyfoil.generators import JoukowskyAirfoil, VanDeVoorenAirfoil, TrefftzKuttaAirfoil, compute_naca
+from pyfoil.generators import JoukowskyAirfoil, VanDeVoorenAirfoil, TrefftzKuttaAirfoil, CSTParameterization, compute_naca
+from pyfoil.spline import ArcLengthSpline
+from pyfoil.pool import SolverPool, default_pool
 
 
 logger = logging.getLogger(__name__)
@@ -18,61 +23,126 @@ solver = xfoil.Solver()
 class Airfoil:
     noseindex: int
     name: str
-    curve: euklid.vector.PolyLine2D
     
     ncrit = 4
     xtr_top = 0.5
     xtr_bottom = 0.5
+    reynolds = 2e6
+    _solver_settings = ("ncrit", "xtr_top", "xtr_bottom", "reynolds")
 
     def __init__(self, data: Sequence[euklid.vector.Vector2D | tuple[float, float]], name="unnamed") -> None:
         self.name = name
         self.curve = euklid.vector.PolyLine2D(data)
 
+    @property
+    def curve(self) -> euklid.vector.PolyLine2D:
+        # airfoils created from a spline (unpickled, shared memory) build the curve on first use
+        if self._curve is None:
+            self._curve = euklid.vector.PolyLine2D(self._spline.points.tolist())
+
+        return self._curve
+
+    @curve.setter
+    def curve(self, curve: euklid.vector.PolyLine2D):
+        self._curve = curve
         self._setup()
 
+    @classmethod
+    def _from_spline(cls, spline: ArcLengthSpline, name="unnamed", s_le: float | None = None) -> "Airfoil":
+        airfoil = cls.__new__(cls)
+        airfoil.name = name
+        airfoil._curve = None
+        airfoil._spline = spline
+        airfoil._setup_nose(s_le)
+
+        return airfoil
+
+    @classmethod
+    def _from_buffer(cls, buffer: bytes, name="unnamed") -> "Airfoil":
+        points = numpy.frombuffer(buffer, dtype=float).reshape(-1, 2)
+        return cls._from_spline(ArcLengthSpline(points), name)
+
+    def __reduce__(self):
+        # pickle the raw coordinates instead of the euklid curve and the spline
+        state = self._get_solver_settings()
+        arguments = (numpy.ascontiguousarray(self._spline.points, dtype=float).tobytes(), self.name)
+
+        if state:
+            return type(self)._from_buffer, arguments, state
+
+        return type(self)._from_buffer, arguments
+
+    def _get_solver_settings(self) -> dict[str, float]:
+        """solver settings overridden on this instance"""
+        return {key: value for key, value in self.__dict__.items() if key in self._solver_settings}
+
     def _setup(self):
-        i = 0
-        data = self.curve.nodes
-        while data[i + 1][0] < data[i][0] and i < len(data) - 2:
-            i += 1
-        self.noseindex = i
-
-        # Create a mapping x -> ik value
-        self._interpolation_x_values = euklid.vector.Interpolation(
-            [[-p[0], i] for i, p in enumerate(self.curve.nodes[:self.noseindex])] +
-            [[ p[0], i+self.noseindex] for i, p in enumerate(self.curve.nodes[self.noseindex:])]
+        self._spline = ArcLengthSpline(self.curve.tolist())
+        self._setup_nose()
+
+    def _setup_nose(self, s_le: float | None = None):
+        if s_le is None:
+            s_le = self._spline.leading_edge()
+
+        self._s_le = s_le
+        self._le = self._spline(self._s_le)
+
+        # first node of the lower side
+        self.noseindex = int(numpy.searchsorted(self._spline.s, self._s_le))
+
+        # x and arc length of both sides from the nose to the trailing edge (x ascending)
+        s = self._spline.s
+        x = self._spline.points[:, 0]
+        i = self.noseindex
+        self._sides = (
+            (numpy.concatenate([[self._le[0]], x[:i][::-1]]), numpy.concatenate([[self._s_le], s[:i][::-1]])),
+            (numpy.concatenate([[self._le[0]], x[i:]]), numpy.concatenate([[self._s_le], s[i:]]))
         )
+        self._side_lists = tuple((x_side.tolist(), s_side.tolist()) for x_side, s_side in self._sides)
 
-    def _load_xfoil(self):
-        solver.ncrit = self.ncrit
-        solver.xtr_top = self.xtr_top
-        solver.xtr_bottom = self.xtr_bottom
+    def _load_xfoil(self, xfoil_solver: xfoil.Solver | None = None):
+        if xfoil_solver is None:
+            xfoil_solver = solver
+
+        xfoil_solver.reynolds = self.reynolds
+        xfoil_solver.ncrit = self.ncrit
+        xfoil_solver.xtr_top = self.xtr_top
+        xfoil_solver.xtr_bottom = self.xtr_bottom
 
         if len(self.curve) > 300:
             raise Exception(f"too many numpoints for profile {self.name}: {len(self.curve)}")
         
-        solver.load(self.curve.tolist())
+        xfoil_solver.load(self.curve.tolist())
 
     
-    def xfoil_aoa(self, aoa: float, degree=True, load=True) -> xfoil.Result:
-        # TODO: reynolds
+    def xfoil_aoa(self, aoa: float, degree=True, load=True, xfoil_solver: xfoil.Solver | None = None) -> xfoil.Result:
+        if xfoil_solver is None:
+            xfoil_solver = solver
+
         if degree:
             aoa = aoa * math.pi / 180
 
         if load:
-            self._load_xfoil()
+            self._load_xfoil(xfoil_solver)
 
-        return solver.run_aoa(aoa)
+        return xfoil_solver.run_aoa(aoa)
     
-    def xfoil_polar(self, aoa_start, aoa_end, steps=10, degree=True) -> pandas.DataFrame:
-        self._load_xfoil()
+    def xfoil_polar(self, aoa_start, aoa_end, steps=10, degree=True, xfoil_solver: xfoil.Solver | None = None,
+                    cancelled: threading.Event | None = None) -> pandas.DataFrame:
+        """
+        cancelled: stop before the next angle of attack once the event is set
+        """
+        self._load_xfoil(xfoil_solver)
         delta = (aoa_end-aoa_start)/(steps-1)
         data = []
         for i in range(steps):
+            if cancelled is not None and cancelled.is_set():
+                break
+
             aoa = aoa_start + delta*i
 
             try:
-                result = self.xfoil_aoa(aoa, degree=degree, load=False)
+                result = self.xfoil_aoa(aoa, degree=degree, load=False, xfoil_solver=xfoil_solver)
             except RuntimeError:
                 continue
 
@@ -87,6 +157,206 @@ class Airfoil:
         
         return pandas.DataFrame(data, columns=["aoa", "cl", "cd", "cdp", "cm"])
 
+    async def xfoil_polar_async(self, aoa_start, aoa_end, steps=10, degree=True, pool: SolverPool | None = None,
+                                timeout: float | None = None) -> pandas.DataFrame:
+        """
+        xfoil_polar on a worker of the pool (default: pyfoil.pool.default_pool()).
+        Raises asyncio.TimeoutError when the polar is not finished after `timeout` seconds.
+        """
+        if pool is None:
+            pool = default_pool()
+
+        def job(xfoil_solver, cancelled):
+            return self.xfoil_polar(aoa_start, aoa_end, steps, degree, xfoil_solver, cancelled)
+
+        return await pool.run(job, timeout=timeout)
+
+    def xfoil_polar_adaptive(self, aoa_start, aoa_end, steps=5, tolerance=0.02, max_solves=30, min_step=0.25, degree=True,
+                             xfoil_solver: xfoil.Solver | None = None) -> pandas.DataFrame:
+        """
+        Compute a polar starting from a coarse grid of `steps` angles and refine
+        intervals where cl/cd/cm deviate from linear interpolation by more than
+        `tolerance` (relative to the range of each coefficient) or where a solve
+        did not converge. Intervals are split down to `min_step` until the
+        tolerance or the total budget of `max_solves` is reached.
+        Every refinement is warm-started from the nearest converged neighbour.
+        """
+        if xfoil_solver is None:
+            xfoil_solver = solver
+
+        self._load_xfoil(xfoil_solver)
+
+        # aoa -> (result, bl-state) or None if unconverged
+        samples: dict[float, tuple[xfoil.Result, xfoil.BLState] | None] = {}
+
+        def solve(aoa, neighbour=None):
+            aoa_rad = aoa * math.pi / 180 if degree else aoa
+
+            if neighbour is not None:
+                xfoil_solver.restore_state(samples[neighbour][1])
+
+            try:
+                result = xfoil_solver.run_aoa(aoa_rad, init_bl=neighbour is None)
+            except RuntimeError:
+                result = None
+
+            if result is not None and result.converged:
+                samples[aoa] = (result, xfoil_solver.save_state())
+            else:
+                samples[aoa] = None
+
+        # coarse pass: march through the grid, warm-starting from the previous point
+        delta = (aoa_end-aoa_start)/(steps-1)
+        previous = None
+        for i in range(steps):
+            aoa = aoa_start + delta*i
+            solve(aoa, previous)
+            if samples[aoa] is not None:
+                previous = aoa
+
+        def coefficients(aoa):
+            result = samples[aoa][0]
+            return (result.cl, result.cd, result.cm)
+
+        while len(samples) < max_solves:
+            angles = sorted(samples)
+            converged = [aoa for aoa in angles if samples[aoa] is not None]
+
+            if len(converged) < 2:
+                break
+
+            values = [coefficients(aoa) for aoa in converged]
+            scales = [max(max(v) - min(v), 1e-9) for v in zip(*values)]
+
+            # interval (a, b) -> refinement error
+            errors: dict[tuple[float, float], float] = {}
+
+            for a, b in zip(angles[:-1], angles[1:]):
+                if samples[a] is None or samples[b] is None:
+                    errors[(a, b)] = math.inf
+
+            for i in range(1, len(converged)-1):
+                a0, a1, a2 = converged[i-1:i+2]
+                f0, f1, f2 = values[i-1:i+2]
+                factor = (a1-a0) / (a2-a0)
+
+                error = max(
+                    abs(y1 - (y0 + (y2-y0)*factor)) / scale
+                    for y0, y1, y2, scale in zip(f0, f1, f2, scales)
+                )
+
+                if error > tolerance:
+                    for a, b in zip(angles[:-1], angles[1:]):
+                        if a0 <= a and b <= a2:
+                            errors[(a, b)] = max(errors.get((a, b), 0), error)
+
+            candidates = sorted(
+                ((error, a, b) for (a, b), error in errors.items() if b - a >= 2 * min_step),
+                reverse=True
+            )
+
+            if not candidates:
+                break
+
+            for _, a, b in candidates[:max_solves - len(samples)]:
+                if samples[a] is not None:
+                    neighbour = a
+                elif samples[b] is not None:
+                    neighbour = b
+                else:
+                    neighbour = None
+
+                solve((a+b)/2, neighbour)
+
+        data = []
+        for aoa in sorted(samples):
+            if samples[aoa] is not None:
+                result = samples[aoa][0]
+                data.append([
+                    result.aoa,
+                    result.cl,
+                    result.cd,
+                    result.cdp,
+                    result.cm
+                ])
+
+        return pandas.DataFrame(data, columns=["aoa", "cl", "cd", "cdp", "cm"])
+
+
+    def xfoil_flap_polar(self, x_hinge, deflections: Sequence[float], aoa_start, aoa_end, steps=10, y_hinge=0.5, degree=True) -> pandas.DataFrame:
+        """
+        Compute polars for several flap deflections (degrees, positive down) in one solver call.
+        The flap is hinged at x_hinge, y_hinge is relative to the local thickness (0: lower, 1: upper).
+        """
+        self._load_xfoil()
+        delta = (aoa_end-aoa_start)/(steps-1)
+        aoa = [aoa_start + delta*i for i in range(steps)]
+
+        if degree:
+            aoa = [a * math.pi / 180 for a in aoa]
+
+        results = solver.run_flap(x_hinge, y_hinge, list(deflections), aoa)
+
+        data = []
+        for flap_results in results:
+            for result in flap_results:
+                if result.converged:
+                    data.append([
+                        result.flap,
+                        result.aoa,
+                        result.cl,
+                        result.cd,
+                        result.cdp,
+                        result.cm,
+                        result.hinge_moment
+                    ])
+
+        return pandas.DataFrame(data, columns=["flap", "aoa", "cl", "cd", "cdp", "cm", "hinge_moment"])
+
+    def xfoil_speed_distribution(self, aoa, degree=True) -> numpy.ndarray:
+        """
+        Inviscid surface speed on the points used for inverse design.
+        Returns an array with the columns (x, q, cp), x<0: upper side, x>0: lower side.
+        """
+        if degree:
+            aoa = aoa * math.pi / 180
+
+        self._load_xfoil()
+        distribution = solver.init_mdes(aoa)
+
+        x = numpy.array(distribution.x)
+        q = numpy.array(distribution.q)
+
+        nose = numpy.argmin(x)
+        x[:nose] *= -1
+
+        return numpy.stack([x, q, 1 - q**2], axis=1)
+
+    def xfoil_inverse(self, target: numpy.ndarray, aoa, degree=True, kind="cp", filter=0.) -> "Airfoil":
+        """
+        Full-inverse design (xfoil mdes) starting from this airfoil.
+        target: array of (x, cp) or (x, q) rows for kind="q", x<0: upper side, x>0: lower side.
+        Outside of the target's x-range the current speed is kept.
+        filter: hanning filter strength to smooth the resulting geometry (0: off)
+        """
+        current = self.xfoil_speed_distribution(aoa, degree=degree)
+        x, q, _ = current.T
+
+        target = numpy.asarray(target, dtype=float)
+        target = target[numpy.argsort(target[:, 0])]
+        value = numpy.interp(x, target[:, 0], target[:, 1])
+
+        if kind == "cp":
+            value = numpy.copysign(numpy.sqrt(numpy.clip(1 - value, 0, None)), q)
+        elif kind != "q":
+            raise ValueError(f"invalid target kind: {kind}")
+
+        inside = (x >= target[0, 0]) & (x <= target[-1, 0])
+        q_new = numpy.where(inside, value, q)
+
+        coordinates = solver.exec_mdes(q_new.tolist(), filter)
+
+        return Airfoil(coordinates, name=f"{self.name}_mdes")
 
     def __mul__(self, value: float) -> "Airfoil":
         fakt = euklid.vector.Vector2D([1, float(value)])
@@ -97,12 +367,48 @@ class Airfoil:
         return self.get_ik(xval)
 
     def get_ik(self, x) -> float:
-        xval = float(x)
-        return self._interpolation_x_values.get_value(xval)
-    
+        i, t = self._spline._locate_scalar(self._get_s_scalar(float(x)))
+        return i + t
+
+    def _get_s_scalar(self, x: float) -> float:
+        """_get_s for a single x-value without numpy overhead"""
+        if x < 0:
+            (x_side, s_side), value, increasing = self._side_lists[0], -x, False
+        else:
+            (x_side, s_side), value, increasing = self._side_lists[1], x, True
+
+        value = min(max(value, x_side[0]), x_side[-1])
+        j = min(max(bisect.bisect_left(x_side, value) - 1, 0), len(x_side) - 2)
+        s0, s1 = s_side[j], s_side[j+1]
+
+        return self._spline.solve_x_scalar(value, min(s0, s1), max(s0, s1), increasing)
+
+    def _get_s(self, x) -> numpy.ndarray:
+        """arc length of the spline point for x-values (<0: upper side)"""
+        x = numpy.asarray(x, dtype=float)
+        result = numpy.empty(x.shape)
+        upper = x < 0
+
+        for mask, value, (x_side, s_side), increasing in (
+                (upper, -x, self._sides[0], False),
+                (~upper, x, self._sides[1], True)):
+            if not mask.any():
+                continue
+
+            value = numpy.clip(value[mask], x_side[0], x_side[-1])
+            j = numpy.clip(numpy.searchsorted(x_side, value) - 1, 0, len(x_side) - 2)
+            s0, s1 = s_side[j], s_side[j+1]
+
+            result[mask] = self._spline.solve_x(value, numpy.minimum(s0, s1), numpy.maximum(s0, s1), increasing)
+
+        return result
+
+    def get_points(self, x_values) -> numpy.ndarray:
+        """Spline points for an array of x-values (<0: upper side), shape: (n, 2)"""
+        return self._spline(self._get_s(x_values))
+
     def get(self, x) -> euklid.vector.Vector2D:
-        ik = self.get_ik(x)
-        return self.curve.get(ik)
+        return euklid.vector.Vector2D(list(self._spline.point(self._get_s_scalar(float(x)))))
 
     def align(self, p) -> euklid.vector.Vector2D:
         """Align a point (x, y) on the airfoil. x: (0,1), y: (-1,1)"""
@@ -131,27 +437,24 @@ class Airfoil:
             *De-rotate airfoil
             *Reset its length to 1
         """
-        nose = self.curve.nodes[self.noseindex]
-
-        new_curve: euklid.vector.PolyLine2D = self.curve.move(nose * -1)
+        points = self._spline.points
+        points = points - points[int(numpy.argmin(points[:, 0]))]
 
-        diff = (new_curve.nodes[0] + new_curve.nodes[-1]) * 0.5
+        diff = (points[0] + points[-1]) * 0.5
 
-        # normalize length
-        new_curve = new_curve.scale(1/diff.length())
+        # normalize length and de-rotate
+        length = numpy.hypot(*diff)
+        cos, sin = diff / length**2
+        points = points @ numpy.array([[cos, -sin], [sin, cos]])
 
-        # de-rotate
-        rotation = euklid.vector.Rotation2D(-diff.angle())
-        new_nodes = [rotation.apply(p) for p in new_curve.nodes]
-
-        new_nodes[0][0] = 1.
-        new_nodes[-1][0] = 1.
+        points[0, 0] = 1.
+        points[-1, 0] = 1.
 
         if close:
-            new_nodes[0][1] = 0
-            new_nodes[-1][1] = 0
-        
-        return Airfoil(new_nodes)
+            points[0, 1] = 0
+            points[-1, 1] = 0
+
+        return Airfoil(points.tolist())
     
     @property
     def normvectors(self) -> euklid.vector.PolyLine2D:
@@ -166,22 +469,20 @@ class Airfoil:
         return self.copy()
 
     def copy(self) -> "Airfoil":
-        return Airfoil(self.curve.nodes, self.name)
+        # the spline is never modified in place, so it can be shared
+        airfoil = Airfoil._from_spline(self._spline, self.name, self._s_le)
+        airfoil.__dict__.update(self._get_solver_settings())
+
+        return airfoil
 
     def __add__(self, other, conservative=False) -> "Airfoil":
         """
         Mix 2 Profiles
         """
-        new = []
-        for i, point in enumerate(self.curve.nodes):
-            x = point[0]
-            if i < self.noseindex:
-                x = -x
-
-            y2 = other.get(x)[1]
-            new.append(point + [0, y2])
-        
-        return Airfoil(new)
+        points = self._spline.points.copy()
+        points[:, 1] += other.get_points(self.x_values)[:, 1]
+
+        return Airfoil(points.tolist())
 
     def __json__(self):
         return {
@@ -239,17 +540,13 @@ class Airfoil:
         """Get XValues of airfoil. upper side neg, lower positive"""
         i = self.noseindex
 
-        x_values = [-vector[0] for vector in self.curve.nodes[:i]]
-        x_values += [vector[0] for vector in self.curve.nodes[i:]]
-        return x_values
+        x_values = self._spline.points[:, 0].copy()
+        x_values[:i] *= -1
+        return x_values.tolist()
 
     def set_x_values(self, xval) -> "Airfoil":
         """Set X-Values of airfoil to defined points."""
-        new_nodes = [
-            self.get(x) for x in xval
-        ]
-
-        return Airfoil(new_nodes)
+        return Airfoil(self.get_points(xval).tolist())
 
     @property
     def numpoints(self) -> int:
@@ -267,11 +564,9 @@ class Airfoil:
     @property
     def thickness(self):
         """return the maximum sickness (Sic!) of an airfoil"""
-        xvals = sorted(set(map(abs, self.x_values)))
+        xvals = numpy.unique(numpy.abs(self.x_values))
 
-        return max([
-            abs(self.get(-x)[1] - self.get(x)[1]) for x in xvals
-        ])
+        return float(numpy.max(numpy.abs(self.get_points(-xvals)[:, 1] - self.get_points(xvals)[:, 1])))
 
     def set_thickness(self, newthick):
         factor = float(newthick / self.thickness)
@@ -284,8 +579,10 @@ class Airfoil:
 
     @property
     def camber_line(self) -> euklid.vector.Interpolation:
-        xvals = sorted(set(map(abs, self.x_values)))
-        return euklid.vector.Interpolation([self.profilepoint(i, 0.) for i in xvals])
+        xvals = numpy.unique(numpy.abs(self.x_values))
+        camber = (self.get_points(-xvals) + self.get_points(xvals)) / 2
+
+        return euklid.vector.Interpolation(camber.tolist())
 
     #@cached_property('self')
     @property
@@ -375,6 +672,60 @@ class Airfoil:
             dat_str = data_file.read().decode('utf8')
             return cls._import_dat(dat_str.split("\n"))
 
+    @classmethod
+    def fetch_many(cls, names: Sequence[str], base_url='http://m-selig.ae.illinois.edu/ads/coord/{name}.dat',
+                   cache_dir=None, concurrency=8) -> dict[str, "Airfoil"]:
+        """
+        Fetch many airfoils concurrently over reused connections.
+        With a cache_dir, validated '.dat' files are mirrored there and airfoils
+        found in the mirror are loaded without any network access.
+        Airfoils that can not be fetched are logged and left out.
+        """
+        from pyfoil.mirror import download_many
+
+        airfoils = {}
+        missing = []
+
+        for name in names:
+            if cache_dir is not None and os.path.exists(os.path.join(cache_dir, f"{name}.dat")):
+                airfoils[name] = cls.import_from_dat(os.path.join(cache_dir, f"{name}.dat"))
+            else:
+                missing.append(name)
+
+        if not missing:
+            return airfoils
+
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        urls = {name: base_url.format(name=name) for name in missing}
+        downloads = download_many(urls.values(), concurrency=concurrency)
+
+        for name in missing:
+            data = downloads[urls[name]]
+
+            if isinstance(data, Exception):
+                logger.error(f"could not fetch airfoil {name}: {data}")
+                continue
+
+            dat_str = data.decode("utf8", errors="replace")
+            lines = dat_str.split("\n")
+
+            if sum(1 for line in lines if cls._re_coord_line.match(line)) < 3:
+                logger.error(f"invalid dat file for airfoil {name}")
+                continue
+
+            airfoils[name] = cls._import_dat(lines)
+
+            if cache_dir is not None:
+                # write atomically, so that concurrent runs never see partial files
+                path = os.path.join(cache_dir, f"{name}.dat")
+                with open(path + f".{os.getpid()}.tmp", "w") as dat_file:
+                    dat_file.write(dat_str)
+                os.replace(path + f".{os.getpid()}.tmp", path)
+
+        return {name: airfoils[name] for name in names if name in airfoils}
+
     def add_flap(self, begin, amount) -> "Airfoil":
         
         def f(x, a, b):
@@ -419,6 +770,17 @@ class Airfoil:
 
         profile = cls(airfoil.coordinates(numpoints), f"VanDeVooren_tau={tau}_epsilon={epsilon}")        
         return profile.normalized()
+
+    @classmethod
+    def compute_cst(cls, parameters: Sequence[float], numpoints=100, name="CST") -> "Airfoil":
+        order = (len(parameters) - 1) // 2 - 1
+        parameterization = CSTParameterization(order=order, numpoints=numpoints)
+
+        return cls(parameterization.coordinates(parameters), name=name)
+
+    def fit_cst(self, order=5) -> list[float]:
+        """Fit CST parameters [upper weights, lower weights, te gap] to the normalized airfoil"""
+        return CSTParameterization(order=order).fit([self.normalized()])[0].tolist()
     
     def _repr_svg_(self) -> str:
         result = '<svg baseProfile="full" height="100%" version="1.1" viewBox="-0.1,-0.25,1.2,0.5" width="100%" xmlns="http://www.w3.org/2000/svg">\n'
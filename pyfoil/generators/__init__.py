@@ -1,4 +1,5 @@
 from pyfoil.generators.joukowsy import JoukowskyAirfoil
 from pyfoil.generators.treffz import TrefftzKuttaAirfoil
 from pyfoil.generators.vandevooren import VanDeVoorenAirfoil
-from pyfoil.generators.naca import compute_naca
\ No newline at end of file
+from pyfoil.generators.naca import compute_naca
+from pyfoil.generators.cst import CSTParameterization
\ No newline at end of file
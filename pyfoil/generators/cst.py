@@ -0,0 +1,76 @@
+from typing import Any, Sequence
+import math
+
+import numpy
+
+
+class CSTParameterization:
+    '''class-shape-transformation (kulfan) parameterization.
+       every side of the airfoil is described by the class function
+       x^n1 * (1-x)^n2 multiplied with a bernstein polynomial of the given order.
+       a parameter vector holds the upper weights, the lower weights
+       and the trailing edge gap: [u_0..u_order, l_0..l_order, te_gap]'''
+
+    def __init__(self, order: int = 5, numpoints: int = 100, n1: float = 0.5, n2: float = 1.0):
+        self.order = order
+        self.numpoints = numpoints
+        self.n1 = n1
+        self.n2 = n2
+
+    @property
+    def num_parameters(self) -> int:
+        return 2 * (self.order + 1) + 1
+
+    @property
+    def x_values(self) -> numpy.ndarray:
+        '''x-values of one side from the trailing edge (1) to the nose (0)'''
+        return 1 - numpy.sin(numpy.linspace(0, 1, self.numpoints) * math.pi / 2)
+
+    def shape_matrix(self, x: numpy.ndarray) -> numpy.ndarray:
+        '''class function times bernstein basis, shape: (len(x), order+1)'''
+        x = numpy.asarray(x, dtype=float)[:, None]
+        i = numpy.arange(self.order + 1)
+        binomial = numpy.array([math.comb(self.order, k) for k in i])
+
+        bernstein = binomial * x**i * (1 - x)**(self.order - i)
+        return x**self.n1 * (1 - x)**self.n2 * bernstein
+
+    def fit(self, airfoils: Sequence[Any]) -> numpy.ndarray:
+        '''least squares fit of normalized airfoils, returns shape: (len(airfoils), num_parameters)'''
+        x = self.x_values[1:-1]
+        upper = numpy.array([airfoil.get_points(-x)[:, 1] for airfoil in airfoils]).T
+        lower = numpy.array([airfoil.get_points(x)[:, 1] for airfoil in airfoils]).T
+        te_gap = numpy.array([airfoil.get(-1.)[1] - airfoil.get(1.)[1] for airfoil in airfoils])
+
+        matrix = self.shape_matrix(x)
+        te = x[:, None] * te_gap / 2
+
+        # one solve for all airfoils (multiple right hand sides)
+        weights_upper = numpy.linalg.lstsq(matrix, upper - te, rcond=None)[0]
+        weights_lower = numpy.linalg.lstsq(matrix, lower + te, rcond=None)[0]
+
+        return numpy.hstack([weights_upper.T, weights_lower.T, te_gap[:, None]])
+
+    def evaluate(self, parameters: numpy.ndarray) -> numpy.ndarray:
+        '''coordinates for many parameter vectors, returns shape: (n, 2*numpoints-1, 2)'''
+        parameters = numpy.atleast_2d(numpy.asarray(parameters, dtype=float))
+        k = self.order + 1
+
+        if parameters.shape[1] != self.num_parameters:
+            raise ValueError(f"expected {self.num_parameters} parameters, got {parameters.shape[1]}")
+
+        x = self.x_values
+        matrix = self.shape_matrix(x)
+        te = parameters[:, -1:] * x / 2
+
+        upper = parameters[:, :k] @ matrix.T + te
+        lower = parameters[:, k:2*k] @ matrix.T - te
+
+        n = len(parameters)
+        xs = numpy.concatenate([x, x[::-1][1:]])
+        ys = numpy.concatenate([upper, lower[:, ::-1][:, 1:]], axis=1)
+
+        return numpy.stack([numpy.broadcast_to(xs, ys.shape), ys], axis=2).reshape(n, -1, 2)
+
+    def coordinates(self, parameters: Sequence[float]) -> list[list[float]]:
+        return self.evaluate(parameters)[0].tolist()
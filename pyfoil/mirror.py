@@ -0,0 +1,99 @@
+from typing import Iterable
+import threading
+import http.client
+import urllib.parse
+import concurrent.futures
+
+
+class _Connections(threading.local):
+    """keep-alive connections per thread, one per (scheme, host)"""
+    def __init__(self, timeout: float, opened: list[http.client.HTTPConnection]):
+        self.timeout = timeout
+        self.opened = opened
+        self.connections: dict[tuple[str, str], http.client.HTTPConnection] = {}
+
+    max_redirects = 5
+    redirects = (301, 302, 303, 307, 308)
+
+    def get(self, url: str) -> bytes:
+        """GET the url, following redirects (to the same or another host)"""
+        location = url
+
+        for _ in range(self.max_redirects + 1):
+            response, data = self._request(location)
+
+            if response.status in self.redirects and response.getheader("Location"):
+                location = urllib.parse.urljoin(location, response.getheader("Location"))
+                continue
+
+            if response.status != 200:
+                raise ValueError(f"{url}: http {response.status}")
+
+            return data
+
+        raise ValueError(f"{url}: too many redirects")
+
+    def _request(self, url: str) -> tuple[http.client.HTTPResponse, bytes]:
+        parsed = urllib.parse.urlsplit(url)
+        path = parsed.path or "/"
+        if parsed.query:
+            path += "?" + parsed.query
+
+        key = (parsed.scheme, parsed.netloc)
+
+        # a reused connection may have been closed by the server, so retry once on a fresh one
+        for retry in (False, True):
+            connection = self.connections.get(key)
+            if connection is None or retry:
+                if connection is not None:
+                    connection.close()
+                connection = self._connect(parsed.scheme, parsed.netloc)
+                self.connections[key] = connection
+                self.opened.append(connection)
+
+            try:
+                connection.request("GET", path)
+                response = connection.getresponse()
+                # read the body of redirects too, so the connection can be reused
+                data = response.read()
+            except (http.client.HTTPException, ConnectionError):
+                if retry:
+                    raise
+                continue
+
+            return response, data
+
+        raise AssertionError("unreachable")
+
+    def _connect(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        if scheme == "http":
+            return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+        raise ValueError(f"unsupported url scheme: {scheme}")
+
+
+def download_many(urls: Iterable[str], concurrency: int = 8, timeout: float = 30.) -> dict[str, bytes | Exception]:
+    """
+    Download all urls with a pool of `concurrency` threads. Each thread reuses
+    its connections. Failed downloads are returned as the exception.
+    """
+    opened: list[http.client.HTTPConnection] = []
+    connections = _Connections(timeout, opened)
+
+    def get(url):
+        try:
+            return connections.get(url)
+        except Exception as e:
+            return e
+
+    urls = list(urls)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        result = dict(zip(urls, executor.map(get, urls)))
+
+    for connection in opened:
+        connection.close()
+
+    return result
@@ -0,0 +1,195 @@
+"""
+Tabulated polars for fast lookup, e.g. in flight simulation.
+
+    table = PolarTable.compute(airfoil, aoa=range(-10, 16), reynolds=[1e5, 3e5, 1e6], ncrit=[4, 9])
+    table.save("naca2412.polar")
+
+    table = PolarTable.load("naca2412.polar")   # memory mapped
+    cl, cd, cdp, cm = table(aoa_array, reynolds_array).T
+
+Values are stored on a regular (ncrit, reynolds, aoa) grid and interpolated
+multilinearly, with log(reynolds) as the reynolds axis. Queries outside of the
+grid are clamped to its edges.
+"""
+from typing import Sequence
+import os
+import math
+import concurrent.futures
+
+import numpy
+
+from pyfoil.airfoil import Airfoil
+from pyfoil.pool import ThreadSolvers
+
+
+class PolarTable:
+    coefficients = ("cl", "cd", "cdp", "cm")
+
+    def __init__(self, aoa: Sequence[float], reynolds: Sequence[float], ncrit: Sequence[float],
+                 values: numpy.ndarray, converged: numpy.ndarray | None = None):
+        """
+        aoa in degree, values: shape (len(ncrit), len(reynolds), len(aoa), 4)
+        converged: mask of the solved grid points, everything else was filled
+        """
+        self.aoa = numpy.asarray(aoa, dtype=float)
+        self.reynolds = numpy.asarray(reynolds, dtype=float)
+        self.ncrit = numpy.asarray(ncrit, dtype=float)
+        self.values = values
+
+        shape = (len(self.ncrit), len(self.reynolds), len(self.aoa), len(self.coefficients))
+        if values.shape != shape:
+            raise ValueError(f"invalid shape of values: {values.shape}, expected {shape}")
+
+        if converged is None:
+            converged = ~numpy.isnan(values).any(axis=-1)
+
+        self.converged = converged
+        self._log_reynolds = numpy.log(self.reynolds)
+
+    @classmethod
+    def compute(cls, airfoil: Airfoil, aoa: Sequence[float], reynolds: Sequence[float],
+                ncrit: Sequence[float] | None = None, workers: int | None = None, fill=True) -> "PolarTable":
+        """
+        Run one batched sweep per (ncrit, reynolds) in a thread pool.
+        Every sweep starts at the angle closest to zero and continues
+        outwards in both directions.
+        """
+        aoa = numpy.sort(numpy.asarray(aoa, dtype=float))
+        reynolds = numpy.sort(numpy.asarray(reynolds, dtype=float))
+        if ncrit is None:
+            ncrit = [airfoil.ncrit]
+        ncrit = numpy.sort(numpy.asarray(ncrit, dtype=float))
+
+        aoa_rad = (aoa * math.pi / 180).tolist()
+        split = int(numpy.searchsorted(aoa, 0.))
+        solvers = ThreadSolvers()
+
+        def sweep(case):
+            ncrit_value, reynolds_value = case
+            solver = solvers.get()
+
+            # keeps all other solver settings of the airfoil (e.g. forced transition)
+            configured = airfoil.copy()
+            configured.ncrit = ncrit_value
+            configured.reynolds = reynolds_value
+            configured._load_xfoil(solver)
+
+            results = solver.run_aoa(aoa_rad[split:])
+            if split > 0:
+                results = solver.run_aoa(aoa_rad[:split][::-1])[::-1] + results
+
+            return [
+                [getattr(result, c) for c in cls.coefficients] if result.converged else [math.nan] * len(cls.coefficients)
+                for result in results
+            ]
+
+        cases = [(n, re) for n in ncrit for re in reynolds]
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            sweeps = list(executor.map(sweep, cases))
+
+        values = numpy.array(sweeps, dtype=float).reshape(len(ncrit), len(reynolds), len(aoa), len(cls.coefficients))
+        table = cls(aoa, reynolds, ncrit, values)
+
+        if fill:
+            table.fill_gaps()
+
+        return table
+
+    def fill_gaps(self) -> None:
+        """
+        Fill unconverged points by linear interpolation along aoa, sweeps
+        without any converged point are interpolated along reynolds and ncrit.
+        Beyond the outermost converged point the values are held constant.
+        """
+        values = numpy.array(self.values)
+        valid = self.converged.copy()
+
+        for axis, coordinates in ((2, self.aoa), (1, self._log_reynolds), (0, self.ncrit)):
+            values = numpy.moveaxis(values, axis, -2)
+            valid = numpy.moveaxis(valid, axis, -1)
+
+            for index in numpy.ndindex(valid.shape[:-1]):
+                mask = valid[index]
+                if mask.all() or not mask.any():
+                    continue
+
+                for k in range(values.shape[-1]):
+                    values[index][~mask, k] = numpy.interp(
+                        coordinates[~mask], coordinates[mask], values[index][mask, k]
+                    )
+                valid[index] = True
+
+            values = numpy.moveaxis(values, -2, axis)
+            valid = numpy.moveaxis(valid, -1, axis)
+
+        if not valid.all():
+            raise ValueError("no converged point to fill the table from")
+
+        self.values = values
+
+    def __call__(self, aoa, reynolds, ncrit=None) -> numpy.ndarray:
+        """
+        Interpolated coefficients for arrays of operating points,
+        returns shape: broadcast(aoa, reynolds, ncrit) + (4,)
+        """
+        if ncrit is None:
+            ncrit = self.ncrit[0]
+
+        aoa, reynolds, ncrit = numpy.broadcast_arrays(
+            numpy.asarray(aoa, dtype=float), numpy.asarray(reynolds, dtype=float), numpy.asarray(ncrit, dtype=float)
+        )
+
+        indices = []
+        weights = []
+        for axis, x in ((self.ncrit, ncrit), (self._log_reynolds, numpy.log(reynolds)), (self.aoa, aoa)):
+            i0, i1, t = self._locate(axis, x.ravel())
+            indices.append((i0, i1))
+            weights.append((1 - t, t))
+
+        result = 0.
+        for corner in numpy.ndindex(2, 2, 2):
+            index = tuple(indices[axis][side] for axis, side in enumerate(corner))
+            weight = weights[0][corner[0]] * weights[1][corner[1]] * weights[2][corner[2]]
+            result = result + weight[:, None] * self.values[index]
+
+        return numpy.asarray(result).reshape(aoa.shape + (len(self.coefficients),))
+
+    def get(self, coefficient: str, aoa, reynolds, ncrit=None) -> numpy.ndarray:
+        return self(aoa, reynolds, ncrit)[..., self.coefficients.index(coefficient)]
+
+    @staticmethod
+    def _locate(axis: numpy.ndarray, x: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        # surrounding grid indices and the relative position in between, clamped to the grid
+        if len(axis) == 1:
+            zero = numpy.zeros(len(x), dtype=int)
+            return zero, zero, numpy.zeros(len(x))
+
+        i0 = numpy.clip(numpy.searchsorted(axis, x) - 1, 0, len(axis) - 2)
+        i1 = i0 + 1
+        t = numpy.clip((x - axis[i0]) / (axis[i1] - axis[i0]), 0., 1.)
+
+        return i0, i1, t
+
+    def save(self, path: str) -> None:
+        """Store as a directory of .npy files"""
+        os.makedirs(path, exist_ok=True)
+
+        for name in ("aoa", "reynolds", "ncrit", "values", "converged"):
+            numpy.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, path: str, mmap=True) -> "PolarTable":
+        """Load a saved table, the values are memory mapped (read-only) by default"""
+        def load_array(name, mmap_mode=None):
+            return numpy.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+        mode = "r" if mmap else None
+
+        return cls(
+            load_array("aoa"),
+            load_array("reynolds"),
+            load_array("ncrit"),
+            load_array("values", mode),
+            load_array("converged", mode)
+        )
@@ -0,0 +1,123 @@
+"""
+Run xfoil from asyncio without blocking the event loop.
+
+    async with SolverPool(workers=4) as pool:
+        polar = await airfoil.xfoil_polar_async(-5, 15, pool=pool, timeout=30)
+        polars = await pool.polars(airfoils, -5, 15, timeout=30)
+
+Every worker thread owns its own xfoil.Solver, the solver releases the GIL
+while it runs. At most `workers` jobs run at the same time, further requests
+wait in the event loop (backpressure) and can be cancelled before they start.
+A running job can not be interrupted inside a solve: on timeout or
+cancellation it stops before its next angle of attack and only then frees its
+worker.
+"""
+from typing import Any, Callable, Sequence
+import os
+import asyncio
+import threading
+import weakref
+import concurrent.futures
+
+import xfoil
+
+
+# job(solver, cancelled, *args)
+Job = Callable[..., Any]
+
+
+class ThreadSolvers(threading.local):
+    """One xfoil.Solver per thread, created on first use"""
+    solver: xfoil.Solver | None = None
+
+    def get(self) -> xfoil.Solver:
+        if self.solver is None:
+            self.solver = xfoil.Solver()
+
+        return self.solver
+
+
+class SolverPool:
+    def __init__(self, workers: int | None = None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="xfoil")
+        self._solvers = ThreadSolvers()
+        # asyncio primitives are bound to one event loop
+        self._slots: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = weakref.WeakKeyDictionary()
+
+    async def __aenter__(self) -> "SolverPool":
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Stop accepting jobs, jobs that have not started yet are dropped"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _call(self, job: Job, cancelled: threading.Event, *args):
+        if cancelled.is_set():
+            return None
+
+        return job(self._solvers.get(), cancelled, *args)
+
+    async def run(self, job: Job, *args, timeout: float | None = None) -> Any:
+        """
+        Run job(solver, cancelled, *args) on a worker thread. The job should
+        return early once the `cancelled` event is set. The timeout includes
+        the time spent waiting for a free worker.
+        """
+        return await asyncio.wait_for(self._run(job, *args), timeout)
+
+    async def _run(self, job: Job, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self.workers)
+
+        await slots.acquire()
+
+        cancelled = threading.Event()
+        try:
+            future = self._executor.submit(self._call, job, cancelled, *args)
+        except BaseException:
+            slots.release()
+            raise
+
+        # the slot is free once the thread is done, not when the caller gives up
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(slots.release)
+            except RuntimeError:
+                pass  # loop closed
+
+        future.add_done_callback(release)
+
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def polars(self, airfoils: Sequence[Any], aoa_start, aoa_end, steps=10, degree=True,
+                     timeout: float | None = None, return_exceptions=True) -> list:
+        """
+        Polars of many airfoils, each with its own timeout. Failed or timed
+        out polars are returned as the exception unless return_exceptions is False.
+        """
+        return await asyncio.gather(*[
+            airfoil.xfoil_polar_async(aoa_start, aoa_end, steps, degree, pool=self, timeout=timeout)
+            for airfoil in airfoils
+        ], return_exceptions=return_exceptions)
+
+
+_default_pool: SolverPool | None = None
+
+
+def default_pool() -> SolverPool:
+    """Shared pool with one worker per cpu, created on first use"""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = SolverPool()
+
+    return _default_pool
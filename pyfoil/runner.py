@@ -0,0 +1,336 @@
+"""
+Sweep runner backed by a SQLite job queue on a shared filesystem.
+
+    python -m pyfoil.runner init queue.db --airfoil a.dat b.dat --reynolds 1e5 5e5 --aoa -5 15 21
+    python -m pyfoil.runner work queue.db      # start as many workers as you like, on any node
+    python -m pyfoil.runner status queue.db
+    python -m pyfoil.runner export queue.db polars.csv
+
+A case is one (airfoil, reynolds, ncrit, flap) combination swept over a list
+of angles of attack. Workers claim cases atomically, solve them with their own
+xfoil.Solver and write the results back in bulk. Cases claimed by a crashed
+worker are handed out again once their lease has expired, finished cases are
+never repeated. Workers only exit when no case is left running, so the
+surviving workers take over the cases of a crashed one.
+"""
+from typing import Any, Iterator, Sequence
+import os
+import io
+import json
+import math
+import time
+import socket
+import sqlite3
+import logging
+import argparse
+import itertools
+import contextlib
+
+import pandas
+import xfoil
+
+from pyfoil.airfoil import Airfoil
+
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_schema = """
+CREATE TABLE IF NOT EXISTS airfoils (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    dat TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cases (
+    id INTEGER PRIMARY KEY,
+    airfoil_id INTEGER NOT NULL REFERENCES airfoils(id),
+    reynolds REAL NOT NULL,
+    ncrit REAL NOT NULL,
+    flap REAL NOT NULL,
+    x_hinge REAL NOT NULL,
+    aoa TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    claimed_at REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS cases_status ON cases(status);
+CREATE TABLE IF NOT EXISTS results (
+    case_id INTEGER NOT NULL REFERENCES cases(id),
+    aoa REAL NOT NULL,
+    cl REAL,
+    cd REAL,
+    cdp REAL,
+    cm REAL,
+    hinge_moment REAL,
+    converged INTEGER NOT NULL
+);
+"""
+
+
+class JobQueue:
+    def __init__(self, path: str, timeout: float = 60.):
+        self.path = path
+        # autocommit mode, transactions are opened explicitly
+        self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.connection.executescript(_schema)
+
+    def close(self):
+        self.connection.close()
+
+    def add_cases(self, airfoils: Sequence[Airfoil], reynolds: Sequence[float], ncrit: Sequence[float],
+                  aoa: Sequence[float], flap: Sequence[float] = (0.,), x_hinge: float = 0.75) -> int:
+        """Add the full case matrix airfoils x reynolds x ncrit x flap, every case sweeps all aoa"""
+        aoa_str = json.dumps([float(a) for a in aoa])
+        count = 0
+
+        with self._transaction() as cursor:
+            for airfoil in airfoils:
+                dat = "\n".join("{: 10.8f}\t{: 10.8f}".format(*p) for p in airfoil.curve.nodes)
+                cursor.execute("INSERT INTO airfoils (name, dat) VALUES (?, ?)", (airfoil.name, dat))
+                airfoil_id = cursor.lastrowid
+
+                rows = [
+                    (airfoil_id, float(re), float(nc), float(fl), float(x_hinge), aoa_str)
+                    for re, nc, fl in itertools.product(reynolds, ncrit, flap)
+                ]
+                cursor.executemany(
+                    "INSERT INTO cases (airfoil_id, reynolds, ncrit, flap, x_hinge, aoa) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                count += len(rows)
+
+        return count
+
+    def claim(self, worker: str, count: int = 1, lease: float = 600.) -> list[dict[str, Any]]:
+        """
+        Atomically claim up to `count` cases. Running cases whose lease has
+        expired (crashed workers) are claimed again.
+        """
+        now = time.time()
+
+        with self._transaction() as cursor:
+            # every add_cases call inserts its own airfoils, so the airfoil identifies the case matrix
+            rows = cursor.execute(
+                """
+                SELECT cases.id, airfoils.name, airfoils.dat, reynolds, ncrit, flap, x_hinge, aoa,
+                    EXISTS(SELECT 1 FROM cases AS other WHERE other.airfoil_id = cases.airfoil_id AND other.flap != 0)
+                FROM cases JOIN airfoils ON airfoils.id = cases.airfoil_id
+                WHERE status = ? OR (status = ? AND claimed_at < ?)
+                ORDER BY cases.id LIMIT ?
+                """,
+                (PENDING, RUNNING, now - lease, count)
+            ).fetchall()
+
+            cursor.executemany(
+                "UPDATE cases SET status = ?, worker = ?, claimed_at = ? WHERE id = ?",
+                [(RUNNING, worker, now, row[0]) for row in rows]
+            )
+
+        return [
+            {
+                "id": case_id,
+                "name": name,
+                "dat": dat,
+                "reynolds": reynolds,
+                "ncrit": ncrit,
+                "flap": flap,
+                "x_hinge": x_hinge,
+                "aoa": json.loads(aoa),
+                "flap_matrix": bool(flap_matrix)
+            }
+            for case_id, name, dat, reynolds, ncrit, flap, x_hinge, aoa, flap_matrix in rows
+        ]
+
+    def renew(self, worker: str, case_ids: Sequence[int]) -> None:
+        """Extend the lease of claimed cases that the worker still holds"""
+        now = time.time()
+
+        with self._transaction() as cursor:
+            cursor.executemany(
+                "UPDATE cases SET claimed_at = ? WHERE id = ? AND worker = ? AND status = ?",
+                [(now, case_id, worker, RUNNING) for case_id in case_ids]
+            )
+
+    def complete(self, worker: str, results: dict[int, list[xfoil.Result]], errors: dict[int, str]):
+        """Write the results of finished cases in one transaction"""
+        rows = [
+            (case_id, r.aoa, r.cl, r.cd, r.cdp, r.cm, r.hinge_moment, r.converged)
+            for case_id, case_results in results.items()
+            for r in case_results
+        ]
+
+        with self._transaction() as cursor:
+            # a case may have been reclaimed by another worker after our lease expired
+            owned = {
+                case_id for case_id, in cursor.execute(
+                    "SELECT id FROM cases WHERE worker = ? AND status = ?", (worker, RUNNING)
+                )
+            }
+
+            cursor.executemany(
+                "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [row for row in rows if row[0] in owned]
+            )
+            cursor.executemany(
+                "UPDATE cases SET status = ? WHERE id = ?",
+                [(DONE, case_id) for case_id in results if case_id in owned]
+            )
+            cursor.executemany(
+                "UPDATE cases SET status = ?, error = ? WHERE id = ?",
+                [(FAILED, error, case_id) for case_id, error in errors.items() if case_id in owned]
+            )
+
+    def status(self) -> dict[str, int]:
+        return dict(self.connection.execute("SELECT status, COUNT(*) FROM cases GROUP BY status").fetchall())
+
+    def results(self) -> pandas.DataFrame:
+        return pandas.read_sql_query(
+            """
+            SELECT airfoils.name AS airfoil, reynolds, ncrit, flap, results.aoa, cl, cd, cdp, cm, hinge_moment
+            FROM results
+            JOIN cases ON cases.id = results.case_id
+            JOIN airfoils ON airfoils.id = cases.airfoil_id
+            WHERE converged
+            ORDER BY cases.id, results.aoa
+            """,
+            self.connection
+        )
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        # take the write lock right away, so that concurrent claims serialize
+        cursor = self.connection.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            yield cursor
+        except BaseException:
+            cursor.execute("ROLLBACK")
+            raise
+        cursor.execute("COMMIT")
+
+
+def run_case(solver: xfoil.Solver, case: dict[str, Any]) -> list[xfoil.Result]:
+    airfoil = Airfoil._import_dat(io.StringIO(case["dat"]), name=case["name"])
+    airfoil.reynolds = case["reynolds"]
+    airfoil.ncrit = case["ncrit"]
+    airfoil._load_xfoil(solver)
+
+    aoa = [a * math.pi / 180 for a in case["aoa"]]
+
+    # the undeflected cases of a flap matrix report their hinge moment too
+    if case["flap_matrix"]:
+        return solver.run_flap(case["x_hinge"], 0.5, [case["flap"]], aoa)[0]
+
+    return solver.run_aoa(aoa)
+
+
+def run_worker(path: str, worker: str | None = None, batch: int = 1, lease: float = 600., poll: float = 10.) -> int:
+    """
+    Process cases until all cases are finished, returns the number of cases processed.
+    The lease is renewed before every case, so it only has to cover a single case.
+    While other workers still run cases, the queue is polled every `poll` seconds
+    to take over the cases of crashed workers once their lease has expired.
+    """
+    if worker is None:
+        worker = f"{socket.gethostname()}-{os.getpid()}"
+
+    queue = JobQueue(path)
+    solver = xfoil.Solver()
+    count = 0
+
+    try:
+        while True:
+            cases = queue.claim(worker, batch, lease)
+            if not cases:
+                if not queue.status().get(RUNNING):
+                    break
+
+                time.sleep(poll)
+                continue
+
+            results: dict[int, list[xfoil.Result]] = {}
+            errors: dict[int, str] = {}
+
+            for i, case in enumerate(cases):
+                if i > 0:
+                    # only this batch, a predecessor with the same name may have crashed on other cases
+                    queue.renew(worker, [c["id"] for c in cases[i:]])
+
+                try:
+                    results[case["id"]] = run_case(solver, case)
+                except Exception as e:
+                    logger.error(f"case {case['id']} failed: {e}")
+                    errors[case["id"]] = str(e)
+
+            queue.complete(worker, results, errors)
+            count += len(cases)
+    finally:
+        queue.close()
+
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pyfoil.runner", description="sqlite backed xfoil sweep runner")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    init = commands.add_parser("init", help="add a case matrix to the queue")
+    init.add_argument("queue")
+    init.add_argument("--airfoil", nargs="+", required=True, help=".dat files")
+    init.add_argument("--reynolds", nargs="+", type=float, default=[Airfoil.reynolds])
+    init.add_argument("--ncrit", nargs="+", type=float, default=[Airfoil.ncrit])
+    init.add_argument("--flap", nargs="+", type=float, default=[0.])
+    init.add_argument("--x-hinge", type=float, default=0.75)
+    init.add_argument("--aoa", nargs=3, type=float, required=True, metavar=("START", "END", "STEPS"))
+
+    work = commands.add_parser("work", help="process cases until all cases are finished")
+    work.add_argument("queue")
+    work.add_argument("--batch", type=int, default=1, help="cases per claim")
+    work.add_argument("--lease", type=float, default=600., help="seconds without progress until a claimed case is handed out again")
+    work.add_argument("--poll", type=float, default=10., help="seconds between claims while other workers run the remaining cases")
+    work.add_argument("--worker", default=None)
+
+    status = commands.add_parser("status", help="print the number of cases per status")
+    status.add_argument("queue")
+
+    export = commands.add_parser("export", help="write all converged results to a csv file")
+    export.add_argument("queue")
+    export.add_argument("output")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "init":
+        start, end, steps = args.aoa
+        steps = int(steps)
+        aoa = [start + (end-start)*i/max(steps-1, 1) for i in range(steps)]
+        airfoils = [Airfoil.import_from_dat(path) for path in args.airfoil]
+
+        queue = JobQueue(args.queue)
+        count = queue.add_cases(airfoils, args.reynolds, args.ncrit, aoa, args.flap, args.x_hinge)
+        queue.close()
+        print(f"added {count} cases")
+
+    elif args.command == "work":
+        count = run_worker(args.queue, args.worker, args.batch, args.lease, args.poll)
+        print(f"processed {count} cases")
+
+    elif args.command == "status":
+        queue = JobQueue(args.queue)
+        for key, value in queue.status().items():
+            print(f"{key}\t{value}")
+        queue.close()
+
+    elif args.command == "export":
+        queue = JobQueue(args.queue)
+        queue.results().to_csv(args.output, index=False)
+        queue.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
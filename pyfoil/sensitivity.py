@@ -0,0 +1,124 @@
+from typing import Callable, Sequence
+import math
+import concurrent.futures
+
+import euklid
+import numpy
+
+from pyfoil.airfoil import Airfoil
+from pyfoil.pool import ThreadSolvers
+
+
+# mode(point, upper) -> y-displacement of the point for a unit shape parameter
+Mode = Callable[[euklid.vector.Vector2D, bool], float]
+
+COEFFICIENTS = ("cl", "cd", "cm")
+
+
+def hicks_henne(position: float, width: float = 3., upper: bool = True) -> Mode:
+    """
+    Hicks-Henne bump with its maximum at x=position on the upper or lower side
+    """
+    exponent = math.log(0.5) / math.log(position)
+
+    def mode(p, upper_side):
+        if upper_side != upper or not 0 < p[0] < 1:
+            return 0.
+
+        bump = math.sin(math.pi * p[0]**exponent) ** width
+
+        return bump if upper else -bump
+
+    return mode
+
+
+def perturb(airfoil: Airfoil, mode: Mode, amount: float) -> Airfoil:
+    """
+    Return a copy of the airfoil (including its solver settings) with the
+    mode applied with the given amount
+    """
+    perturbed = airfoil.copy()
+    perturbed.apply_function(lambda p, upper: p + [0, amount * mode(p, upper)])
+
+    return perturbed
+
+
+def compute_sensitivities(
+        airfoil: Airfoil,
+        modes: Sequence[Mode],
+        aoa: Sequence[float],
+        step: float = 1e-3,
+        workers: int | None = None,
+        degree: bool = True
+        ) -> numpy.ndarray:
+    """
+    Forward finite-difference derivatives of cl, cd and cm with respect to the
+    amplitude of every mode.
+
+    The base airfoil is solved once per operating point; every perturbed
+    airfoil is loaded once and warm-started from the base boundary layer at
+    each operating point, falling back to a cold start if the warm start
+    does not converge. Solves run in a thread pool with one solver per
+    thread.
+
+    Returns an array of shape (len(aoa), 3, len(modes)), unconverged entries
+    are nan.
+    """
+    if degree:
+        aoa_rad = [a * math.pi / 180 for a in aoa]
+    else:
+        aoa_rad = list(aoa)
+
+    solvers = ThreadSolvers()
+
+    def solve_base(aoa_value):
+        solver = solvers.get()
+        airfoil._load_xfoil(solver)
+
+        try:
+            result = solver.run_aoa(aoa_value)
+        except RuntimeError:
+            return None, None
+
+        return [getattr(result, c) for c in COEFFICIENTS], solver.save_state()
+
+    def solve_mode(mode):
+        solver = solvers.get()
+        perturbed = perturb(airfoil, mode, step)
+        perturbed._load_xfoil(solver)
+
+        values = []
+        for aoa_value, state in zip(aoa_rad, states):
+            if state is None:
+                values.append([math.nan] * len(COEFFICIENTS))
+                continue
+
+            solver.restore_state(state)
+            try:
+                result = solver.run_aoa(aoa_value, init_bl=False)
+            except RuntimeError:
+                # the warm start can fail where a cold start converges
+                try:
+                    result = solver.run_aoa(aoa_value)
+                except RuntimeError:
+                    values.append([math.nan] * len(COEFFICIENTS))
+                    continue
+
+            values.append([getattr(result, c) for c in COEFFICIENTS])
+
+        return values
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        base = list(executor.map(solve_base, aoa_rad))
+        states = [state for _, state in base]
+        perturbed = list(executor.map(solve_mode, modes))
+
+    base_values = numpy.array([
+        values if values is not None else [math.nan] * len(COEFFICIENTS)
+        for values, _ in base
+    ])
+
+    # (modes, aoa, coefficients) -> (aoa, coefficients, modes)
+    perturbed_values = numpy.array(perturbed).reshape(len(modes), len(aoa_rad), len(COEFFICIENTS))
+
+    return (perturbed_values - base_values).transpose(1, 2, 0) / step
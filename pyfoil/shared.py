@@ -0,0 +1,128 @@
+"""
+Airfoil libraries in shared memory for process pools.
+
+    with SharedAirfoils.create(airfoils) as library:
+        with multiprocessing.Pool() as pool:
+            pool.map(work, [(library, i) for i in range(len(library))])
+
+Coordinates and the interpolation splines of all airfoils live in one
+multiprocessing.shared_memory block. Pickling a SharedAirfoils only sends
+the name of the block and the small index, workers attach to the block and
+build airfoils on views of it without copying the coordinates or computing
+the splines again.
+"""
+from typing import Iterator, Sequence
+import sys
+import weakref
+import multiprocessing.shared_memory
+
+import numpy
+
+from pyfoil.airfoil import Airfoil
+from pyfoil.spline import ArcLengthSpline
+
+
+class SharedAirfoils(Sequence[Airfoil]):
+    def __init__(self, memory: multiprocessing.shared_memory.SharedMemory, counts: Sequence[int],
+                 leading_edges: Sequence[float], names: Sequence[str], owner=False):
+        self.memory = memory
+        self.counts = numpy.asarray(counts, dtype=int)
+        self.leading_edges = numpy.asarray(leading_edges, dtype=float)
+        self.names = list(names)
+        self.owner = owner
+
+        # layout: all points (n, 2), all arc lengths (n), all spline coefficients (n - count, 4, 2)
+        total = int(self.counts.sum())
+        intervals = total - len(self.counts)
+        data = numpy.ndarray(3 * total + 8 * intervals, dtype=float, buffer=memory.buf)
+        data.flags.writeable = False
+
+        self._points = data[:2*total].reshape(total, 2)
+        self._s = data[2*total:3*total]
+        self._coefficients = data[3*total:].reshape(intervals, 4, 2)
+
+        self._offsets = numpy.concatenate([[0], numpy.cumsum(self.counts)])
+
+        # splines handed out, they keep the memory block mapped
+        self._views: weakref.WeakSet[ArcLengthSpline] = weakref.WeakSet()
+
+    @classmethod
+    def create(cls, airfoils: Sequence[Airfoil]) -> "SharedAirfoils":
+        """Copy the airfoils into a new shared memory block owned by this process"""
+        counts = [len(airfoil._spline.points) for airfoil in airfoils]
+        total = sum(counts)
+        intervals = total - len(counts)
+        size = (3 * total + 8 * intervals) * numpy.dtype(float).itemsize
+
+        memory = multiprocessing.shared_memory.SharedMemory(create=True, size=max(size, 1))
+        data = numpy.ndarray(3 * total + 8 * intervals, dtype=float, buffer=memory.buf)
+
+        data[:2*total] = numpy.concatenate([airfoil._spline.points for airfoil in airfoils]).ravel()
+        data[2*total:3*total] = numpy.concatenate([airfoil._spline.s for airfoil in airfoils])
+        data[3*total:] = numpy.concatenate([airfoil._spline.coefficients for airfoil in airfoils]).ravel()
+        del data
+
+        leading_edges = [airfoil._s_le for airfoil in airfoils]
+        names = [airfoil.name for airfoil in airfoils]
+
+        return cls(memory, counts, leading_edges, names, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, counts: Sequence[int], leading_edges: Sequence[float], names: Sequence[str]) -> "SharedAirfoils":
+        if sys.version_info >= (3, 13):
+            # the creating process is responsible for unlinking
+            memory = multiprocessing.shared_memory.SharedMemory(name, track=False)
+        else:
+            # registering again with the resource tracker shared with the creator is a no-op
+            memory = multiprocessing.shared_memory.SharedMemory(name)
+
+        return cls(memory, counts, leading_edges, names)
+
+    def __reduce__(self):
+        return SharedAirfoils.attach, (self.memory.name, self.counts, self.leading_edges, self.names)
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __getitem__(self, index):  # type: ignore
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"airfoil index out of range: {index}")
+
+        start, end = self._offsets[index], self._offsets[index+1]
+        spline = ArcLengthSpline.from_arrays(
+            self._points[start:end],
+            self._s[start:end],
+            self._coefficients[start-index:end-index-1],
+            owner=self.memory
+        )
+        self._views.add(spline)
+
+        return Airfoil._from_spline(spline, self.names[index], float(self.leading_edges[index]))
+
+    def __iter__(self) -> Iterator[Airfoil]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        """
+        Detach from the memory block, the owner also frees it. Airfoils taken
+        from the library stay valid, the block is unmapped once they are gone.
+        """
+        self._points = self._s = self._coefficients = None  # type: ignore
+
+        if self.owner:
+            self.memory.unlink()
+
+        if not self._views:
+            self.memory.close()
+
+    def __enter__(self) -> "SharedAirfoils":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
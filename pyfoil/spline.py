@@ -0,0 +1,257 @@
+import bisect
+
+import numpy
+
+
+class ArcLengthSpline:
+    """
+    Cubic spline through 2d points, parameterized by the arc length of the
+    polyline (like xfoil's segspl). Doubled points are corners: the spline is
+    split there and every segment gets zero second derivatives at its ends.
+    """
+    def __init__(self, points):
+        self.points = numpy.asarray(points, dtype=float)
+
+        lengths = numpy.linalg.norm(numpy.diff(self.points, axis=0), axis=1)
+        self.s = numpy.concatenate([[0.], numpy.cumsum(lengths)])
+        derivatives = numpy.zeros_like(self.points)
+
+        corners = numpy.flatnonzero(lengths == 0)
+        bounds = numpy.concatenate([[0], corners + 1, [len(self.points)]])
+
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if end - start > 1:
+                derivatives[start:end] = self._solve(self.s[start:end], self.points[start:end])
+
+        # cubic polynomial in t = (s - s_i) / h_i for every interval, shape: (n-1, 4, 2)
+        self._h = numpy.where(lengths > 0, lengths, 1.)
+        h = self._h[:, None]
+        p0, p1 = self.points[:-1], self.points[1:]
+        d0, d1 = derivatives[:-1] * h, derivatives[1:] * h
+        self.coefficients = numpy.stack([p0, d0, 3 * (p1 - p0) - 2 * d0 - d1, 2 * (p0 - p1) + d0 + d1], axis=1)
+        self._lists = None
+
+    @classmethod
+    def from_arrays(cls, points: numpy.ndarray, s: numpy.ndarray, coefficients: numpy.ndarray,
+                    owner: object = None) -> "ArcLengthSpline":
+        """
+        Wrap precomputed arrays (e.g. views into shared memory) without copying them.
+        owner: kept alive as long as the spline, e.g. the memory the arrays are views of
+        """
+        spline = cls.__new__(cls)
+        spline._owner = owner
+        spline.points = points
+        spline.s = s
+        spline.coefficients = coefficients
+
+        lengths = numpy.diff(s)
+        spline._h = numpy.where(lengths > 0, lengths, 1.)
+        spline._lists = None
+
+        return spline
+
+    @property
+    def length(self) -> float:
+        return self.s[-1]
+
+    @staticmethod
+    def _solve(s: numpy.ndarray, points: numpy.ndarray) -> numpy.ndarray:
+        # tridiagonal system for the first derivatives (thomas algorithm)
+        n = len(s)
+        h = numpy.diff(s)
+        slope = numpy.diff(points, axis=0) / h[:, None]
+
+        lower = numpy.zeros(n)
+        diagonal = numpy.full(n, 2.)
+        upper = numpy.zeros(n)
+        rhs = numpy.zeros_like(points)
+
+        upper[0] = 1.
+        rhs[0] = 3 * slope[0]
+        lower[-1] = 1.
+        rhs[-1] = 3 * slope[-1]
+
+        lower[1:-1] = h[1:]
+        diagonal[1:-1] = 2 * (h[:-1] + h[1:])
+        upper[1:-1] = h[:-1]
+        rhs[1:-1] = 3 * (h[1:, None] * slope[:-1] + h[:-1, None] * slope[1:])
+
+        # plain python numbers are much faster than numpy rows for the recurrence,
+        # x and y are solved together as the real and imaginary part
+        lower, diagonal, upper = lower.tolist(), diagonal.tolist(), upper.tolist()
+        values = (rhs[:, 0] + 1j * rhs[:, 1]).tolist()
+
+        for i in range(1, n):
+            factor = lower[i] / diagonal[i-1]
+            diagonal[i] -= factor * upper[i-1]
+            values[i] -= factor * values[i-1]
+
+        values[-1] /= diagonal[-1]
+        for i in range(n-2, -1, -1):
+            values[i] = (values[i] - upper[i] * values[i+1]) / diagonal[i]
+
+        values = numpy.array(values)
+
+        return numpy.stack([values.real, values.imag], axis=1)
+
+    def _scalar_data(self) -> tuple[list, list, list]:
+        # python lists for scalar queries, numpy overhead dominates for single values
+        if self._lists is None:
+            self._lists = (self.s.tolist(), self._h.tolist(), self.coefficients.tolist())
+
+        return self._lists
+
+    def _locate_scalar(self, s: float) -> tuple[int, float]:
+        s_list, h_list, _ = self._scalar_data()
+        i = min(max(bisect.bisect_right(s_list, s) - 1, 0), len(s_list) - 2)
+
+        return i, (s - s_list[i]) / h_list[i]
+
+    def point(self, s: float) -> tuple[float, float]:
+        """single point at the arc length s"""
+        i, t = self._locate_scalar(s)
+        (x0, y0), (x1, y1), (x2, y2), (x3, y3) = self._scalar_data()[2][i]
+
+        return x0 + t * (x1 + t * (x2 + t * x3)), y0 + t * (y1 + t * (y2 + t * y3))
+
+    def segment(self, s: numpy.ndarray) -> numpy.ndarray:
+        """index of the (non-degenerate) interval containing s, binary search"""
+        return numpy.clip(numpy.searchsorted(self.s, s, side="right") - 1, 0, len(self.s) - 2)
+
+    def _locate(self, s: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        i = self.segment(s)
+        h = self._h[i]
+        return i, (s - self.s[i]) / h, h
+
+    def evaluate(self, s, derivative=0) -> numpy.ndarray:
+        """points (or their 1st/2nd derivative with respect to s) at the arc lengths s"""
+        i, t, h = self._locate(numpy.asarray(s, dtype=float))
+        c0, c1, c2, c3 = numpy.moveaxis(self.coefficients[i], -2, 0)
+        t = t[..., None]
+        h = h[..., None]
+
+        if derivative == 0:
+            return c0 + t * (c1 + t * (c2 + t * c3))
+        if derivative == 1:
+            return (c1 + t * (2 * c2 + t * 3 * c3)) / h
+        if derivative == 2:
+            return (2 * c2 + 6 * c3 * t) / h**2
+
+        raise ValueError(f"invalid derivative: {derivative}")
+
+    def __call__(self, s) -> numpy.ndarray:
+        return self.evaluate(s)
+
+    def leading_edge(self) -> float:
+        """
+        Arc length of the nose, the point of minimum x (x'(s) = 0) next to the
+        node with the smallest x-value. Newton iteration like xfoil's lefind.
+        """
+        i = int(numpy.argmin(self.points[:, 0]))
+        s_list, h_list, coefficients = self._scalar_data()
+
+        lo = s_list[max(i - 1, 0)]
+        hi = s_list[min(i + 1, len(s_list) - 1)]
+        s_le = s_list[i]
+
+        for _ in range(50):
+            j, t = self._locate_scalar(s_le)
+            _, (x1, _), (x2, _), (x3, _) = coefficients[j]
+            h = h_list[j]
+
+            slope = (x1 + t * (2 * x2 + t * 3 * x3)) / h
+            curvature = (2 * x2 + 6 * x3 * t) / h**2
+
+            step = -slope / curvature if curvature > 0 else 0.
+            s_le = min(max(s_le + step, lo), hi)
+
+            if abs(step) < 1e-12 * self.length:
+                break
+
+        return float(s_le)
+
+    def solve_x(self, x, lo, hi, increasing=True, iterations=60) -> numpy.ndarray:
+        """
+        Arc lengths where the x-coordinate equals x. The root has to be
+        bracketed by [lo, hi] within one interval of the spline, with x
+        monotonic in between. Safeguarded newton.
+        """
+        x = numpy.asarray(x, dtype=float)
+        lo = numpy.asarray(lo, dtype=float)
+        i, t_lo, h = self._locate(lo)
+        t_hi = numpy.minimum((numpy.asarray(hi, dtype=float) - self.s[i]) / h, 1.)
+
+        sign = 1. if increasing else -1.
+        c0, c1, c2, c3 = sign * numpy.moveaxis(self.coefficients[i, :, 0], -1, 0)
+        x = sign * x
+
+        def f(t):
+            return c0 - x + t * (c1 + t * (c2 + t * c3))
+
+        f_lo = f(t_lo)
+        f_hi = f(t_hi)
+        span = numpy.where(f_hi != f_lo, f_hi - f_lo, 1.)
+        t = t_lo + numpy.clip(-f_lo / span, 0., 1.) * (t_hi - t_lo)
+
+        for _ in range(iterations):
+            residual = f(t)
+            slope = c1 + t * (2 * c2 + t * 3 * c3)
+
+            t_lo = numpy.where(residual < 0, t, t_lo)
+            t_hi = numpy.where(residual > 0, t, t_hi)
+
+            with numpy.errstate(divide="ignore", invalid="ignore"):
+                newton = t - residual / slope
+
+            inside = (slope > 0) & (newton > t_lo) & (newton < t_hi)
+            t_new = numpy.where(residual == 0, t, numpy.where(inside, newton, (t_lo + t_hi) / 2))
+
+            done = numpy.all(numpy.abs(t_new - t) < 1e-14)
+            t = t_new
+
+            if done:
+                break
+
+        return self.s[i] + t * h
+
+    def solve_x_scalar(self, x: float, lo: float, hi: float, increasing=True, iterations=60) -> float:
+        """solve_x for a single value, same safeguarded newton on python floats"""
+        i, t_lo = self._locate_scalar(lo)
+        s_list, h_list, coefficients = self._scalar_data()
+        h = h_list[i]
+        t_hi = min((hi - s_list[i]) / h, 1.)
+
+        sign = 1. if increasing else -1.
+        c0, c1, c2, c3 = (sign * c[0] for c in coefficients[i])
+        x = sign * x
+
+        def f(t):
+            return c0 - x + t * (c1 + t * (c2 + t * c3))
+
+        f_lo = f(t_lo)
+        f_hi = f(t_hi)
+        fraction = -f_lo / (f_hi - f_lo) if f_hi != f_lo else 0.
+        t = t_lo + min(max(fraction, 0.), 1.) * (t_hi - t_lo)
+
+        for _ in range(iterations):
+            residual = f(t)
+            if residual == 0:
+                break
+
+            slope = c1 + t * (2 * c2 + t * 3 * c3)
+
+            if residual < 0:
+                t_lo = t
+            else:
+                t_hi = t
+
+            newton = t - residual / slope if slope > 0 else t_lo
+            t_new = newton if t_lo < newton < t_hi else (t_lo + t_hi) / 2
+
+            done = abs(t_new - t) < 1e-14
+            t = t_new
+
+            if done:
+                break
+
+        return s_list[i] + t * h
@@ -93,7 +93,7 @@ setuptools.setup(
     cmdclass={"build_ext": CMakeBuild},
     license='GPL-V3',
     long_description=long_description,
-    install_requires=["euklid", "pandas"],
+    install_requires=["euklid", "pandas", "numpy"],
     author='airgproducts',
     url='http://github.com/airgproducts/pyfoil',
     #test_suite="tests.test_suite",
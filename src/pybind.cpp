@@ -19,6 +19,8 @@ PYBIND11_MODULE(xfoil, m) {
         .def_readonly("xtr_bottom", &Result::xtr_bottom)
         .def_readonly("reynolds", &Result::reynolds)
         .def_readonly("converged", &Result::converged)
+        .def_readonly("flap", &Result::flap)
+        .def_readonly("hinge_moment", &Result::hinge_moment)
         .def("__repr__", [](const Result& result) {
             std::stringstream out;
 
@@ -29,17 +31,34 @@ PYBIND11_MODULE(xfoil, m) {
             out << "xtr_top\t" << result.xtr_top << "\n";
             out << "xtr_bottom\t" << result.xtr_bottom << "\n";
             out << "reynolds\t" << result.reynolds << "\n";
+            out << "hinge_moment\t" << result.hinge_moment << "\n";
             out << "converged\t" << result.converged;
 
 
             return out.str();
         });
 
+    py::class_<SpeedDistribution>(m, "SpeedDistribution")
+        .def_readonly("s", &SpeedDistribution::s)
+        .def_readonly("x", &SpeedDistribution::x)
+        .def_readonly("y", &SpeedDistribution::y)
+        .def_readonly("q", &SpeedDistribution::q);
+
+    py::class_<BLState>(m, "BLState")
+        .def_readonly("n", &BLState::n);
+
     py::class_<Solver>(m, "Solver")
         .def(py::init<>())
-        .def("load", &Solver::load)
-        .def("run_aoa", py::overload_cast<double>(&Solver::run_aoa))
-        .def("run_aoa", py::overload_cast<std::vector<double>>(&Solver::run_aoa))
+        // release the gil while solving, so that separate Solver instances can run in threads
+        .def("load", &Solver::load, py::call_guard<py::gil_scoped_release>())
+        .def("run_aoa", py::overload_cast<double, bool>(&Solver::run_aoa), py::arg("aoa"), py::arg("init_bl")=true, py::call_guard<py::gil_scoped_release>())
+        .def("run_aoa", py::overload_cast<std::vector<double>>(&Solver::run_aoa), py::call_guard<py::gil_scoped_release>())
+        .def("set_flap", &Solver::set_flap, py::arg("x_hinge"), py::arg("y_hinge"), py::arg("deflection"), py::call_guard<py::gil_scoped_release>())
+        .def("run_flap", &Solver::run_flap, py::arg("x_hinge"), py::arg("y_hinge"), py::arg("deflection"), py::arg("aoa"), py::call_guard<py::gil_scoped_release>())
+        .def("init_mdes", &Solver::init_mdes, py::arg("aoa"))
+        .def("exec_mdes", &Solver::exec_mdes, py::arg("q"), py::arg("filter")=0.)
+        .def("save_state", &Solver::save_state)
+        .def("restore_state", &Solver::restore_state)
 
         .def("set_debug", [](Solver& solver, bool debug) {
             solver.set_debug(debug);
@@ -48,7 +67,9 @@ PYBIND11_MODULE(xfoil, m) {
         .def_readwrite("viscous", &Solver::viscous)
         .def_readwrite("xtr_top", &Solver::xtr_top)
         .def_readwrite("xtr_bottom", &Solver::xtr_bottom)
-        .def_readwrite("ncrit", &Solver::ncrit);
+        .def_readwrite("ncrit", &Solver::ncrit)
+        .def_readwrite("reynolds", &Solver::reynolds)
+        .def_readwrite("mach", &Solver::mach);
 
     m.attr("__version__") = py::str(version);
 }
\ No newline at end of file
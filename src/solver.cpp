@@ -4,6 +4,8 @@
 bool Solver::load(std::vector<std::pair<double, double>> vectors) {
     std::stringstream stream;
 
+    this->coordinates = vectors;
+
     this->solver.setCancel(false);
     if(!this->solver.initXFoilGeometry(vectors)) {
         return false;
@@ -21,7 +23,7 @@ bool Solver::load(std::vector<std::pair<double, double>> vectors) {
 
 };
 
-Result Solver::run_aoa(double aoa) {
+Result Solver::run_aoa(double aoa, bool init_bl) {
     this->solver.setAlpha(aoa);
     this->solver.lalfa = true;
 
@@ -35,8 +37,10 @@ Result Solver::run_aoa(double aoa) {
 
     // here we go !
 
-    this->solver.setBLInitialized(false);
-    this->solver.lipan = false;
+    if (init_bl) {
+        this->solver.setBLInitialized(false);
+        this->solver.lipan = false;
+    }
 
     return this->solve();
 }
@@ -260,10 +264,173 @@ std::vector<Result> Solver::run_aoa(std::vector<double> aoa) {
 */
 }
 
+bool Solver::set_flap(double x_hinge, double y_hinge, double deflection) {
+    auto xfoil = &(this->solver);
+
+    // start from the loaded (undeflected) buffer airfoil
+    for (size_t i=0; i<this->coordinates.size(); i++) {
+        xfoil->xb[i+1] = this->coordinates[i].first;
+        xfoil->yb[i+1] = this->coordinates[i].second;
+    }
+    xfoil->nb = this->coordinates.size();
+
+    xfoil->get_segment_lengthes(xfoil->xb, xfoil->yb, xfoil->sb, xfoil->nb);
+    xfoil->segspl(xfoil->xb, xfoil->xbp, xfoil->sb, xfoil->nb);
+    xfoil->segspl(xfoil->yb, xfoil->ybp, xfoil->sb, xfoil->nb);
+
+    // y_hinge is relative to the local thickness and is made absolute by flap()
+    xfoil->xbf = x_hinge;
+    xfoil->ybf = y_hinge;
+    xfoil->ddef = deflection;
+
+    xfoil->flap();
+    // flap() skips the geometry change for tiny deflections, but we still want hinge moments
+    xfoil->lbflap = true;
+
+    return xfoil->abcopy();
+}
+
+std::vector<std::vector<Result>> Solver::run_flap(double x_hinge, double y_hinge, std::vector<double> deflection, std::vector<double> aoa) {
+    std::vector<std::vector<Result>> result;
+
+    for (auto flap: deflection) {
+        if (!this->set_flap(x_hinge, y_hinge, flap)) {
+            throw std::runtime_error(fmt::format("could not set flap deflection {}: {} points (max {})", flap, this->solver.nb, IQX-2));
+        }
+
+        auto flap_result = this->run_aoa(aoa);
+
+        for (auto& r: flap_result) {
+            r.flap = flap;
+        }
+
+        result.push_back(flap_result);
+    }
+
+    return result;
+}
+
+SpeedDistribution Solver::init_mdes(double aoa) {
+    auto xfoil = &(this->solver);
+
+    xfoil->setAlpha(aoa);
+    xfoil->setQInf(1.0);
+
+    // start from the loaded geometry instead of a previous design
+    xfoil->lscini = false;
+    xfoil->lqspec = false;
+    xfoil->nqsp = 1;
+    xfoil->iacqsp = 1;
+    xfoil->alqsp[1] = aoa;
+
+    xfoil->InitMDES();
+
+    SpeedDistribution result;
+
+    for (int i=1; i<=xfoil->nsp; i++) {
+        result.s.push_back(xfoil->sspec[i]);
+        result.x.push_back(xfoil->xspoc[i]);
+        result.y.push_back(xfoil->yspoc[i]);
+        result.q.push_back(xfoil->qspec[1][i]);
+    }
+
+    return result;
+}
+
+std::vector<std::pair<double, double>> Solver::exec_mdes(std::vector<double> q, double filter) {
+    auto xfoil = &(this->solver);
+
+    if (!xfoil->lscini || int(q.size()) != xfoil->nsp) {
+        throw std::invalid_argument(fmt::format("expected {} speed values from init_mdes, got {}", xfoil->nsp, q.size()));
+    }
+
+    for (int i=1; i<=xfoil->nsp; i++) {
+        xfoil->qspec[1][i] = q[i-1];
+    }
+
+    // mapping coefficients for the new speed distribution, optionally smoothed
+    xfoil->cncalc(xfoil->qspec[1], false);
+    xfoil->cnfilt(filter);
+    xfoil->piqsum();
+    xfoil->qspcir();
+
+    xfoil->ExecMDES();
+
+    // mapgen does not pass back the number of points
+    xfoil->nb = xfoil->nc;
+
+    std::vector<std::pair<double, double>> coordinates;
+
+    for (int i=1; i<=xfoil->nc; i++) {
+        coordinates.push_back({xfoil->xb[i], xfoil->yb[i]});
+    }
+
+    return coordinates;
+}
+
 void Solver::set_debug(bool debug) {
     this->solver.debug = debug;
 }
 
+BLState Solver::save_state() {
+    if (!this->solver.isBLInitialized()) {
+        throw std::runtime_error("no boundary layer solution to save");
+    }
+
+    BLState state;
+    state.n = this->solver.n;
+
+    memcpy(state.thet, this->solver.thet, IVX * ISX * sizeof(double));
+    memcpy(state.dstr, this->solver.dstr, IVX * ISX * sizeof(double));
+    memcpy(state.ctau, this->solver.ctau, IVX * ISX * sizeof(double));
+    memcpy(state.uedg, this->solver.uedg, IVX * ISX * sizeof(double));
+    memcpy(state.mass, this->solver.mass, IVX * ISX * sizeof(double));
+    memcpy(state.itran, this->solver.itran, ISX * sizeof(int));
+
+    state.ist = this->solver.ist;
+    state.sst = this->solver.sst;
+    state.sst_go = this->solver.sst_go;
+    state.sst_gp = this->solver.sst_gp;
+    state.nsys = this->solver.nsys;
+    memcpy(state.iblte, this->solver.iblte, ISX * sizeof(int));
+    memcpy(state.nbl, this->solver.nbl, ISX * sizeof(int));
+    memcpy(state.ipan, this->solver.ipan, IVX * ISX * sizeof(int));
+    memcpy(state.isys, this->solver.isys, IVX * ISX * sizeof(int));
+    memcpy(state.xssi, this->solver.xssi, IVX * ISX * sizeof(double));
+    memcpy(state.vti, this->solver.vti, IVX * ISX * sizeof(double));
+
+    return state;
+}
+
+void Solver::restore_state(const BLState& state) {
+    if (state.n != this->solver.n) {
+        throw std::invalid_argument(fmt::format("state has {} panel nodes, loaded geometry has {}", state.n, this->solver.n));
+    }
+
+    memcpy(this->solver.thet, state.thet, IVX * ISX * sizeof(double));
+    memcpy(this->solver.dstr, state.dstr, IVX * ISX * sizeof(double));
+    memcpy(this->solver.ctau, state.ctau, IVX * ISX * sizeof(double));
+    memcpy(this->solver.uedg, state.uedg, IVX * ISX * sizeof(double));
+    memcpy(this->solver.mass, state.mass, IVX * ISX * sizeof(double));
+    memcpy(this->solver.itran, state.itran, ISX * sizeof(int));
+
+    this->solver.ist = state.ist;
+    this->solver.sst = state.sst;
+    this->solver.sst_go = state.sst_go;
+    this->solver.sst_gp = state.sst_gp;
+    this->solver.nsys = state.nsys;
+    memcpy(this->solver.iblte, state.iblte, ISX * sizeof(int));
+    memcpy(this->solver.nbl, state.nbl, ISX * sizeof(int));
+    memcpy(this->solver.ipan, state.ipan, IVX * ISX * sizeof(int));
+    memcpy(this->solver.isys, state.isys, IVX * ISX * sizeof(int));
+    memcpy(this->solver.xssi, state.xssi, IVX * ISX * sizeof(double));
+    memcpy(this->solver.vti, state.vti, IVX * ISX * sizeof(double));
+
+    // the stagnation point is moved from the restored position during the next solve
+    this->solver.setBLInitialized(true);
+    this->solver.lipan = true;
+}
+
 Result Solver::getResult() { //Foil *pFoil
     auto pXFoil = &(this->solver);
 
@@ -280,6 +447,8 @@ Result Solver::getResult() { //Foil *pFoil
     result.cm           = pXFoil->cm;
     result.reynolds     = pXFoil->reinf;
     result.converged    = true;
+    result.flap         = pXFoil->lflap ? pXFoil->ddef : 0.;
+    result.hinge_moment = pXFoil->lflap ? pXFoil->hmom : 0.;
     //result.m_Mach       = pXFoil->minf;
     //result.ACrit        = pXFoil->acrit;
 
@@ -13,23 +13,66 @@ struct Result {
     double xtr_bottom = 0;
     double reynolds;
 
+    double flap = 0;
+    double hinge_moment = 0;
+
     bool is_viscous;
     bool converged = false;
 };
 
 
+/**
+ * surface speed on the circle-plane points used by the full-inverse (mdes) design.
+ * s: normalized arc length (0: upper trailing edge, 1: lower trailing edge),
+ * x, y: chord-normalized position, q: speed / qinf (negative on the lower side)
+ */
+struct SpeedDistribution {
+    std::vector<double> s;
+    std::vector<double> x;
+    std::vector<double> y;
+    std::vector<double> q;
+};
+
+
+/**
+ * converged boundary layer of one operating point, used to warm-start
+ * a later solve on the same (or a slightly modified) geometry.
+ */
+struct BLState {
+    int n = 0;
+
+    double thet[IVX][ISX];
+    double dstr[IVX][ISX];
+    double ctau[IVX][ISX];
+    double uedg[IVX][ISX];
+    double mass[IVX][ISX];
+    int itran[ISX];
+
+    // bl position -> panel / system pointers
+    int ist;
+    double sst, sst_go, sst_gp;
+    int nsys;
+    int iblte[ISX], nbl[ISX];
+    int ipan[IVX][ISX], isys[IVX][ISX];
+    double xssi[IVX][ISX], vti[IVX][ISX];
+};
+
+
 class Solver {
     public:
         Solver() : solver() {};
 
         bool load(std::vector<std::pair<double, double>> coordinates);
 
-        Result run_aoa(double aoa);
+        Result run_aoa(double aoa, bool init_bl=true);
         Result run_cl(double cl);
 
         std::vector<Result> run_aoa(std::vector<double> aoa);
         std::vector<Result> run_cl(std::vector<double> aoa);
 
+        bool set_flap(double x_hinge, double y_hinge, double deflection);
+        std::vector<std::vector<Result>> run_flap(double x_hinge, double y_hinge, std::vector<double> deflection, std::vector<double> aoa);
+
         bool viscous = true;
 
         double ncrit = 4;
@@ -49,12 +92,18 @@ class Solver {
 
         void set_debug(bool debug);
 
+        SpeedDistribution init_mdes(double aoa);
+        std::vector<std::pair<double, double>> exec_mdes(std::vector<double> q, double filter=0);
+
+        BLState save_state();
+        void restore_state(const BLState& state);
+
     private:
         Result solve();
         Result getResult();
         int iterate();
 
-        std::vector<std::tuple<double, double>> coordinates;
+        std::vector<std::pair<double, double>> coordinates;
 
         XFoil solver;
     
@@ -71,6 +71,8 @@ struct blData
 
 class XFoil
 {
+    friend class Solver;
+
 public:
     XFoil();
     virtual ~XFoil();
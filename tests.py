@@ -22,11 +22,37 @@ import os
 import tempfile
 import unittest
 import random
+import threading
+import functools
+import multiprocessing
+import http.server
+import asyncio
+import pickle
+import gc
+import time
+
+import numpy
+import xfoil
 
 from pyfoil import Airfoil
+from pyfoil.sensitivity import compute_sensitivities, hicks_henne, perturb
+from pyfoil.runner import JobQueue, run_worker
+from pyfoil.polar_table import PolarTable
+from pyfoil.pool import SolverPool
+from pyfoil.shared import SharedAirfoils
 
 TEMPDIR =  tempfile.gettempdir()
 
+
+class CustomAirfoil(Airfoil):
+    pass
+
+
+def shared_thickness(args):
+    library, index = args
+    return library[index].thickness
+
+
 class TestNaca(unittest.TestCase):
     def setUp(self):
         self.airfoil = Airfoil.compute_naca(1222, numpoints=150)
@@ -54,6 +80,14 @@ class TestNaca(unittest.TestCase):
         x = random.random() * random.randint(-1, 1)
         self.assertAlmostEqual(abs(x), self.airfoil.profilepoint(x)[0])
 
+    def test_spline_interpolation(self):
+        fine = Airfoil.compute_naca(2412, numpoints=400)
+        coarse = fine.resample(100)
+        x = numpy.linspace(-0.9, 0.9, 181)
+
+        error = numpy.abs(coarse.get_points(x) - fine.get_points(x)).max()
+        self.assertLess(error, 2e-5)
+
     def test_multiplication(self):
         factor = random.random()
         other = self.airfoil * factor
@@ -69,6 +103,14 @@ class TestNaca(unittest.TestCase):
         prof = Airfoil.compute_naca(naca=m+p+thickness, numpoints=numpoints)
         self.assertAlmostEqual(prof.thickness*100, thickness, 0)
 
+    def test_cst(self):
+        parameters = self.airfoil.fit_cst(order=5)
+        self.assertEqual(len(parameters), 13)
+
+        other = Airfoil.compute_cst(parameters, numpoints=100)
+        self.assertAlmostEqual(other.thickness, self.airfoil.thickness, places=3)
+        self.assertAlmostEqual(other.camber, self.airfoil.camber, places=3)
+
     def test_add(self):
         other = self.airfoil.copy()
         other = self.airfoil + other
@@ -103,6 +145,226 @@ class TestNaca(unittest.TestCase):
     def test_polar(self):
         self.airfoil.xfoil_polar(-5, 15, 20)
 
+    def test_flap_polar(self):
+        airfoil = Airfoil.compute_naca(1222, numpoints=100)
+        polar = airfoil.xfoil_flap_polar(0.75, [0, 10], 2.5, 5, 2)
+        cl_clean = polar[polar["flap"] == 0]["cl"].values
+        cl_flap = polar[polar["flap"] == 10]["cl"].values
+
+        self.assertEqual(len(polar), 4)
+        self.assertTrue(all(cl_flap > cl_clean))
+
+    def test_inverse(self):
+        current = self.airfoil.xfoil_speed_distribution(4)
+        target = current[:, [0, 2]]
+        same = self.airfoil.xfoil_inverse(target, 4)
+        self.assertAlmostEqual(same.thickness, self.airfoil.thickness, 3)
+
+        # more suction on the upper mid-chord
+        segment = (target[:, 0] > -0.6) & (target[:, 0] < -0.2)
+        target[segment, 1] -= 0.1
+        designed = self.airfoil.xfoil_inverse(target, 4)
+        result = designed.xfoil_speed_distribution(4)
+
+        cp_current = numpy.interp(-0.4, current[:, 0], current[:, 2])
+        cp_designed = numpy.interp(-0.4, result[:, 0], result[:, 2])
+        self.assertLess(cp_designed, cp_current - 0.03)
+
+    def test_polar_table(self):
+        table = PolarTable.compute(self.airfoil, [0, 2, 4], [5e5, 1e6], fill=False)
+        table.values[0, 0, 1] = float("nan")
+        table.converged[0, 0, 1] = False
+        table.fill_gaps()
+
+        path = os.path.join(tempfile.mkdtemp(), "table.polar")
+        table.save(path)
+        table = PolarTable.load(path)
+
+        cl = table.get("cl", [0, 1, 2, 4], 1e6)
+        self.assertAlmostEqual(cl[0], table.values[0, 1, 0, 0])
+        self.assertAlmostEqual(cl[1], table.values[0, 1, :2, 0].mean())
+        self.assertAlmostEqual(table(2, 5e5)[0], table.values[0, 0, [0, 2], 0].mean())
+        self.assertEqual(table([1, 2, 3], [5e5, 6e5, 7e5]).shape, (3, 4))
+
+    def test_polar_table_settings(self):
+        self.airfoil.xtr_top = self.airfoil.xtr_bottom = 0.05
+        table = PolarTable.compute(self.airfoil, [0, 2], [1e6])
+
+        self.airfoil.reynolds = 1e6
+        self.assertAlmostEqual(table.get("cd", 2, 1e6), self.airfoil.xfoil_aoa(2).cd, places=5)
+
+    def test_polar_async(self):
+        async def run():
+            async with SolverPool(workers=2) as pool:
+                polars = await pool.polars([self.airfoil, self.airfoil * 0.8], 0, 5, 3)
+
+                with self.assertRaises(asyncio.TimeoutError):
+                    await self.airfoil.xfoil_polar_async(-5, 15, 100, pool=pool, timeout=0.01)
+
+            return polars
+
+        polars = asyncio.run(run())
+        self.assertEqual(len(polars), 2)
+        self.assertEqual(len(polars[0]), 3)
+
+    def test_polar_adaptive(self):
+        dense = self.airfoil.xfoil_polar(-5, 20, 51)
+        # half the solves of the dense polar, on a separate solver
+        polar = self.airfoil.xfoil_polar_adaptive(-5, 20, steps=6, max_solves=25, xfoil_solver=xfoil.Solver())
+
+        self.assertLessEqual(len(polar), 25)
+        self.assertGreater(len(polar), 6)
+        self.assertTrue(polar["aoa"].is_monotonic_increasing)
+
+        # same clmax and stall angle, and the same cl curve in between
+        self.assertAlmostEqual(polar["cl"].max(), dense["cl"].max(), delta=0.01)
+        self.assertAlmostEqual(polar["aoa"][polar["cl"].idxmax()], dense["aoa"][dense["cl"].idxmax()], delta=1.)
+
+        cl = numpy.interp(dense["aoa"], polar["aoa"], polar["cl"])
+        self.assertLess(numpy.abs(cl - dense["cl"]).max(), 0.02)
+
+    def test_sensitivities(self):
+        modes = [hicks_henne(0.3, upper=True), hicks_henne(0.3, upper=False)]
+        jacobian = compute_sensitivities(self.airfoil, modes, [0, 4], workers=2)
+
+        self.assertEqual(jacobian.shape, (2, 3, 2))
+        # thickening the upper side increases lift
+        self.assertGreater(jacobian[0, 0, 0], 0)
+        self.assertLess(jacobian[0, 0, 1], 0)
+
+    def test_sensitivities_settings(self):
+        self.airfoil.reynolds = 2e5
+        self.airfoil.ncrit = 9
+        mode = hicks_henne(0.3)
+
+        perturbed = perturb(self.airfoil, mode, 1e-3)
+        self.assertEqual(perturbed.reynolds, 2e5)
+        self.assertEqual(perturbed.ncrit, 9)
+
+        # a derivative at Re=2e5, not a difference between two reynolds numbers
+        jacobian = compute_sensitivities(self.airfoil, [mode], [2])
+        self.assertLess(abs(jacobian[0, 1, 0]), 0.5)
+
+    def test_runner(self):
+        path = os.path.join(tempfile.mkdtemp(), "queue.db")
+        queue = JobQueue(path)
+        queue.add_cases([self.airfoil], reynolds=[2e5, 1e6], ncrit=[9], aoa=[2, 4])
+
+        # a crashed worker: its case is handed out again once the lease expired
+        crashed = queue.claim("crashed", 1)[0]["id"]
+        queue.connection.execute("UPDATE cases SET claimed_at = claimed_at - 1000 WHERE worker = 'crashed'")
+
+        # a restarted worker with the same name only renews its own batch
+        queue.renew("crashed", [crashed + 1])
+        claimed_at, = queue.connection.execute("SELECT claimed_at FROM cases WHERE id = ?", (crashed,)).fetchone()
+        self.assertLess(claimed_at, time.time() - 900)
+
+        # a second crash, its lease expires while the workers are running
+        queue.add_cases([self.airfoil], reynolds=[5e5], ncrit=[9], aoa=[2, 4])
+        queue.claim("crashed-later", 1)
+        queue.connection.execute("UPDATE cases SET claimed_at = claimed_at - 598 WHERE worker = 'crashed-later'")
+
+        workers = [
+            multiprocessing.Process(target=run_worker, args=(path,), kwargs={"batch": 2, "poll": 0.2})
+            for _ in range(2)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(queue.status(), {"done": 3})
+        self.assertEqual(len(queue.results()), 6)
+        queue.close()
+
+    def test_runner_flap(self):
+        path = os.path.join(tempfile.mkdtemp(), "queue.db")
+        queue = JobQueue(path)
+        airfoil = Airfoil.compute_naca(1222, numpoints=100)
+        queue.add_cases([airfoil], reynolds=[1e6], ncrit=[9], aoa=[2], flap=[0, 5])
+
+        run_worker(path)
+
+        # hinge moments of the undeflected flap as well
+        results = queue.results()
+        self.assertEqual(len(results), 2)
+        self.assertTrue((results["hinge_moment"] != 0).all())
+        queue.close()
+
+    def test_pickle(self):
+        self.airfoil.reynolds = 1e5
+        other = pickle.loads(pickle.dumps(self.airfoil))
+
+        self.assertEqualAirfoil(self.airfoil, other)
+        self.assertEqual(other.reynolds, 1e5)
+        self.assertEqual(other.name, self.airfoil.name)
+
+        custom = CustomAirfoil(self.airfoil.curve.tolist())
+        self.assertIs(type(pickle.loads(pickle.dumps(custom))), CustomAirfoil)
+
+    def test_shared_airfoils(self):
+        airfoils = [Airfoil.compute_naca(naca, numpoints=50) for naca in (2408, 2412, 2416)]
+
+        with SharedAirfoils.create(airfoils) as library:
+            with multiprocessing.Pool(2) as pool:
+                thickness = pool.map(shared_thickness, [(library, i) for i in range(len(library))])
+
+            # airfoils outlive the library they were taken from
+            attached = pickle.loads(pickle.dumps(library))
+            kept = [attached[0], library[1]]
+            del attached
+            gc.collect()
+
+        for airfoil, value in zip(airfoils, thickness):
+            self.assertAlmostEqual(airfoil.thickness, value)
+
+        gc.collect()
+        for airfoil, other in zip(airfoils, kept):
+            self.assertEqualAirfoil(airfoil, other)
+
+    def test_fetch_many(self):
+        served_dir = tempfile.mkdtemp()
+        cache_dir = tempfile.mkdtemp()
+        names = [f"airfoil_{i}" for i in range(5)]
+
+        for name in names:
+            self.airfoil.export_dat(os.path.join(served_dir, f"{name}.dat"))
+
+        class Handler(http.server.SimpleHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                # the database moved airfoil_3
+                if self.path == "/airfoil_3.dat":
+                    self.send_response(301)
+                    self.send_header("Location", "/moved/airfoil_3.dat")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                else:
+                    super().do_GET()
+
+        os.mkdir(os.path.join(served_dir, "moved"))
+        os.rename(os.path.join(served_dir, "airfoil_3.dat"), os.path.join(served_dir, "moved", "airfoil_3.dat"))
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(Handler, directory=served_dir))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}/{{name}}.dat"
+
+        airfoils = Airfoil.fetch_many(names + ["missing"], base_url, cache_dir, concurrency=2)
+        server.shutdown()
+        server.server_close()
+
+        self.assertEqual(list(airfoils), names)
+        self.assertEqualAirfoil(airfoils[names[0]], self.airfoil)
+        self.assertEqualAirfoil(airfoils["airfoil_3"], self.airfoil)
+
+        # offline from the mirror
+        airfoils = Airfoil.fetch_many(names, base_url, cache_dir)
+        self.assertEqual(list(airfoils), names)
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
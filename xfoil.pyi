@@ -17,21 +17,49 @@ class Result:
     @property
     def converged(self) -> bool: ...
     @property
+    def flap(self) -> float: ...
+    @property
+    def hinge_moment(self) -> float: ...
+    @property
     def reynolds(self) -> float: ...
     @property
     def xtr_bottom(self) -> float: ...
     @property
     def xtr_top(self) -> float: ...
 
+class BLState:
+    def __init__(self, *args, **kwargs) -> None: ...
+    @property
+    def n(self) -> int: ...
+
+class SpeedDistribution:
+    def __init__(self, *args, **kwargs) -> None: ...
+    @property
+    def q(self) -> List[float]: ...
+    @property
+    def s(self) -> List[float]: ...
+    @property
+    def x(self) -> List[float]: ...
+    @property
+    def y(self) -> List[float]: ...
+
 class Solver:
+    mach: float
     ncrit: float
+    reynolds: float
     viscous: bool
     xtr_bottom: float
     xtr_top: float
     def __init__(self) -> None: ...
+    def exec_mdes(self, q: List[float], filter: float = ...) -> List[Tuple[float,float]]: ...
+    def init_mdes(self, aoa: float) -> SpeedDistribution: ...
     def load(self, arg0: List[Tuple[float,float]]) -> bool: ...
     @overload
-    def run_aoa(self, arg0: float) -> Result: ...
+    def run_aoa(self, aoa: float, init_bl: bool = ...) -> Result: ...
     @overload
     def run_aoa(self, arg0: List[float]) -> List[Result]: ...
+    def restore_state(self, arg0: BLState) -> None: ...
+    def run_flap(self, x_hinge: float, y_hinge: float, deflection: List[float], aoa: List[float]) -> List[List[Result]]: ...
+    def save_state(self) -> BLState: ...
     def set_debug(self, arg0: bool) -> None: ...
+    def set_flap(self, x_hinge: float, y_hinge: float, deflection: float) -> bool: ...